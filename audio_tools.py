@@ -0,0 +1,350 @@
+import os
+import glob
+import struct
+import time
+import concurrent.futures
+
+import numpy as np
+
+# --- Configuration ---
+AUDIO_DIR = "comic_audio"
+THREAD_POOL_SIZE = 8
+
+# Loudness normalization (BS.1770-style gating on unweighted mean-square energy)
+TARGET_LUFS = -18.0
+PEAK_LIMIT_DBFS = -1.0  # Gain is capped so no sample clips above this
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+BLOCK_SECONDS = 0.4  # Gating block length
+BLOCK_STEP_SECONDS = 0.1  # 75% overlap between blocks
+
+# Silence trimming (TTS utterances come back with uneven leading/trailing silence)
+SILENCE_THRESHOLD_DBFS = -45.0
+SILENCE_WINDOW_SECONDS = 0.01
+HEAD_PADDING_SECONDS = 0.05
+TAIL_PADDING_SECONDS = 0.15
+
+# numpy dtype for each (WAV format tag, bits per sample) we can memory-map
+PCM_DTYPES = {
+    (1, 16): np.dtype("<i2"),
+    (1, 32): np.dtype("<i4"),
+    (3, 32): np.dtype("<f4"),
+}
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def open_wav(path, mode="r"):
+    """
+    Memory-maps the samples of a PCM WAV file without decoding it.
+    Returns (samples, sample_rate), where samples has shape (frames, channels).
+    Use mode="r+" to modify the samples in place.
+    """
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        riff, _, wave = struct.unpack("<4sI4s", f.read(12))
+        if riff != b"RIFF" or wave != b"WAVE":
+            raise ValueError(f"{path} is not a WAV file")
+
+        audio_format = None
+        while True:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                raise ValueError(f"{path} has no data chunk")
+            chunk_id, chunk_size = struct.unpack("<4sI", chunk_header)
+            if chunk_id == b"fmt ":
+                fmt = f.read(chunk_size)
+                audio_format, channels, sample_rate, _, _, bits = struct.unpack(
+                    "<HHIIHH", fmt[:16]
+                )
+                if audio_format == WAVE_FORMAT_EXTENSIBLE:
+                    # The real format tag is the first field of the sub-format GUID
+                    audio_format = struct.unpack("<H", fmt[24:26])[0]
+                f.seek(chunk_size % 2, os.SEEK_CUR)
+            elif chunk_id == b"data":
+                data_offset = f.tell()
+                # Streamed WAVs (e.g. ffmpeg to a pipe) may carry a bogus size
+                data_size = min(chunk_size, file_size - data_offset)
+                break
+            else:
+                f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+    if audio_format is None:
+        raise ValueError(f"{path} has no fmt chunk")
+    dtype = PCM_DTYPES.get((audio_format, bits))
+    if dtype is None:
+        raise ValueError(
+            f"{path}: unsupported WAV format {audio_format} with {bits}-bit samples"
+        )
+
+    frames = data_size // (dtype.itemsize * channels)
+    if frames == 0:
+        return np.zeros((0, channels), dtype=dtype), sample_rate
+    samples = np.memmap(
+        path, dtype=dtype, mode=mode, offset=data_offset, shape=(frames, channels)
+    )
+    return samples, sample_rate
+
+
+def write_wav(path, samples, sample_rate):
+    """Writes (frames, channels) samples to a WAV file with a canonical header."""
+    audio_format = 3 if samples.dtype.kind == "f" else 1
+    channels = samples.shape[1]
+    block_align = samples.dtype.itemsize * channels
+    data = np.ascontiguousarray(samples).tobytes()
+    with open(path, "wb") as f:
+        f.write(struct.pack("<4sI4s", b"RIFF", 36 + len(data), b"WAVE"))
+        f.write(
+            struct.pack(
+                "<4sIHHIIHH",
+                b"fmt ",
+                16,
+                audio_format,
+                channels,
+                sample_rate,
+                sample_rate * block_align,
+                block_align,
+                samples.dtype.itemsize * 8,
+            )
+        )
+        f.write(struct.pack("<4sI", b"data", len(data)))
+        f.write(data)
+
+
+def full_scale(dtype):
+    """Returns the value that corresponds to 0 dBFS for a sample dtype."""
+    if dtype.kind == "f":
+        return 1.0
+    return float(np.iinfo(dtype).max + 1)
+
+
+def block_energies(samples, sample_rate):
+    """
+    Mean-square energy (relative to full scale) of overlapping gating blocks,
+    computed from 100 ms sub-blocks with a sliding sum instead of a Python loop.
+    """
+    step = int(sample_rate * BLOCK_STEP_SECONDS)
+    blocks_per_window = int(round(BLOCK_SECONDS / BLOCK_STEP_SECONDS))
+    sub_blocks = len(samples) // step
+    if sub_blocks == 0:
+        return np.zeros(0)
+
+    x = samples[: sub_blocks * step].astype(np.float32) / full_scale(samples.dtype)
+    # Channel powers are summed, as in BS.1770
+    power = np.square(x).sum(axis=1, dtype=np.float64)
+    sub_energy = power.reshape(sub_blocks, step).mean(axis=1)
+    if sub_blocks < blocks_per_window:
+        return sub_energy.mean(keepdims=True)
+
+    cumulative = np.concatenate(([0.0], np.cumsum(sub_energy)))
+    window_sums = cumulative[blocks_per_window:] - cumulative[:-blocks_per_window]
+    return window_sums / blocks_per_window
+
+
+def energy_to_lufs(energy):
+    """Converts mean-square energy to an (unweighted) LUFS figure."""
+    return -0.691 + 10 * np.log10(np.maximum(energy, 1e-12))
+
+
+def gated_loudness(energies):
+    """
+    Integrated loudness of a set of block energies with absolute and relative
+    gating. Returns None if everything is below the absolute gate (silence).
+    """
+    energies = energies[energy_to_lufs(energies) > ABSOLUTE_GATE_LUFS]
+    if len(energies) == 0:
+        return None
+    relative_gate = energy_to_lufs(energies.mean()) + RELATIVE_GATE_LU
+    energies = energies[energy_to_lufs(energies) > relative_gate]
+    return float(energy_to_lufs(energies.mean()))
+
+
+def measure_wav(path):
+    """Returns the gating block energies and absolute sample peak of a WAV file."""
+    samples, sample_rate = open_wav(path)
+    energies = block_energies(samples, sample_rate)
+    if len(samples):
+        # max/min rather than abs() so the most negative integer cannot overflow
+        peak = max(float(samples.max()), -float(samples.min()))
+        peak /= full_scale(samples.dtype)
+    else:
+        peak = 0.0
+    return energies, peak
+
+
+def scale_samples(samples, gain_db):
+    """Returns samples scaled by `gain_db` in their dtype, saturating integers."""
+    gain = 10 ** (gain_db / 20)
+    if samples.dtype.kind == "f":
+        return (samples * gain).astype(samples.dtype)
+    info = np.iinfo(samples.dtype)
+    scaled = np.rint(samples * gain)
+    return np.clip(scaled, info.min, info.max).astype(samples.dtype)
+
+
+def apply_gain(path, gain_db):
+    """Scales the samples of a WAV file in place, saturating integer formats."""
+    samples, _ = open_wav(path, mode="r+")
+    if not len(samples):
+        return
+    samples[:] = scale_samples(samples, gain_db)
+    samples.flush()
+
+
+def write_with_gain(path, output_path, gain_db):
+    """Writes a copy of a WAV file scaled by `gain_db`, leaving the original as is."""
+    samples, sample_rate = open_wav(path)
+    write_wav(output_path, scale_samples(samples, gain_db), sample_rate)
+
+
+def find_speech_bounds(samples, sample_rate, threshold_dbfs=SILENCE_THRESHOLD_DBFS):
+    """
+    Returns the (start, end) sample range between the first and last short
+    window louder than `threshold_dbfs`, or None if the audio is all silence.
+    """
+    window = max(1, int(sample_rate * SILENCE_WINDOW_SECONDS))
+    windows = -(-len(samples) // window)  # Ceiling division keeps the remainder
+    if windows == 0:
+        return None
+
+    x = samples.astype(np.float32) / full_scale(samples.dtype)
+    power = np.square(x).sum(axis=1)
+    power = np.pad(power, (0, windows * window - len(power)))
+    energy = power.reshape(windows, window).mean(axis=1)
+    loud = np.flatnonzero(energy > 10 ** (threshold_dbfs / 10))
+    if len(loud) == 0:
+        return None
+    return loud[0] * window, min(len(samples), (loud[-1] + 1) * window)
+
+
+def trim_silence(
+    path,
+    head_padding=HEAD_PADDING_SECONDS,
+    tail_padding=TAIL_PADDING_SECONDS,
+    threshold_dbfs=SILENCE_THRESHOLD_DBFS,
+):
+    """
+    Trims leading and trailing silence from a WAV file in place, keeping
+    `head_padding`/`tail_padding` seconds around the speech. Works directly on
+    the PCM samples. Returns the number of seconds removed.
+    """
+    samples, sample_rate = open_wav(path)
+    bounds = find_speech_bounds(samples, sample_rate, threshold_dbfs)
+    if bounds is None:
+        return 0.0
+
+    start = max(0, bounds[0] - int(head_padding * sample_rate))
+    end = min(len(samples), bounds[1] + int(tail_padding * sample_rate))
+    removed = len(samples) - (end - start)
+    if removed == 0:
+        return 0.0
+
+    trimmed = np.array(samples[start:end])
+    del samples  # Release the memory map before replacing the file
+    tmp_path = path + ".tmp"
+    write_wav(tmp_path, trimmed, sample_rate)
+    os.replace(tmp_path, path)
+    return removed / sample_rate
+
+
+def loudness_gains(wav_paths, speakers=None, target_lufs=TARGET_LUFS):
+    """
+    Measures every WAV file in parallel and returns the gain {path: gain_db}
+    that brings it to `target_lufs`. `speakers` optionally gives the speaker of
+    each file (None for files with several voices); single-speaker files share
+    their speaker's loudness over all of that speaker's files, so each voice
+    keeps its natural line-to-line dynamics. Silent and unreadable files get
+    no gain.
+    """
+    if speakers is None:
+        speakers = [None] * len(wav_paths)
+
+    def try_measure_wav(path):
+        try:
+            return measure_wav(path)
+        except ValueError as e:
+            print(f"   - Could not measure {os.path.basename(path)}: {e}")
+            return None
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=THREAD_POOL_SIZE
+    ) as executor:
+        measurements = list(executor.map(try_measure_wav, wav_paths))
+    readable = [
+        (path, speaker, measurement)
+        for path, speaker, measurement in zip(wav_paths, speakers, measurements)
+        if measurement is not None
+    ]
+    wav_paths, speakers, measurements = (
+        [item[k] for item in readable] for k in range(3)
+    )
+
+    file_loudness = {
+        path: gated_loudness(energies)
+        for path, (energies, _) in zip(wav_paths, measurements)
+    }
+
+    speaker_energies = {}
+    for speaker, (energies, _) in zip(speakers, measurements):
+        if speaker is not None:
+            speaker_energies.setdefault(speaker, []).append(energies)
+    speaker_loudness = {
+        speaker: gated_loudness(np.concatenate(energies))
+        for speaker, energies in speaker_energies.items()
+    }
+
+    gains = {}
+    for path, speaker, (_, peak) in zip(wav_paths, speakers, measurements):
+        if file_loudness[path] is None:
+            print(f"   - {os.path.basename(path)} is silent. Skipping.")
+            continue
+        loudness = speaker_loudness.get(speaker)
+        if loudness is None:
+            loudness = file_loudness[path]
+        gain_db = target_lufs - loudness
+        if peak > 0:
+            gain_db = min(gain_db, PEAK_LIMIT_DBFS - 20 * np.log10(peak))
+        gains[path] = float(gain_db)
+
+    for speaker, loudness in sorted(speaker_loudness.items()):
+        if loudness is not None:
+            print(f"   - Speaker '{speaker}': {loudness:.1f} LUFS")
+    for path, gain_db in gains.items():
+        print(
+            f"   - {os.path.basename(path)}: {file_loudness[path]:.1f} LUFS, gain {gain_db:+.1f} dB"
+        )
+    return gains
+
+
+def normalize_loudness(wav_paths, speakers=None, target_lufs=TARGET_LUFS):
+    """
+    Brings every WAV file to `target_lufs` in place, measuring and applying
+    gain across all files in parallel (see loudness_gains for `speakers`).
+    Returns {path: gain_db}.
+    """
+    start_time = time.perf_counter()
+    gains = loudness_gains(wav_paths, speakers, target_lufs)
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=THREAD_POOL_SIZE
+    ) as executor:
+        list(executor.map(apply_gain, gains.keys(), gains.values()))
+
+    elapsed = time.perf_counter() - start_time
+    print(
+        f"✅ Normalized {len(gains)} files to {target_lufs:.1f} LUFS in {elapsed:.3f}s."
+    )
+    return gains
+
+
+def main():
+    """Normalizes every frame audio file in AUDIO_DIR independently."""
+    wav_paths = sorted(glob.glob(os.path.join(AUDIO_DIR, "*.wav")))
+    if not wav_paths:
+        print(f"Error: No WAV files found in '{AUDIO_DIR}'.")
+        return
+    print(f"--- Normalizing loudness of {len(wav_paths)} files in '{AUDIO_DIR}' ---")
+    normalize_loudness(wav_paths)
+
+
+if __name__ == "__main__":
+    main()
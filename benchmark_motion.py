@@ -0,0 +1,100 @@
+import os
+import glob
+import shutil
+import time
+
+import create_movie
+from resource_governor import format_bytes
+
+# --- Configuration ---
+PANEL_COUNT = 3  # Number of panels to encode in each mode
+BENCHMARK_DIR = "temp_motion_benchmark"
+TARGET_RATIO = 2.0  # Motion should cost at most this multiple of still encoding
+DEFAULT_PRESET = "medium"  # x264's preset when none is given
+
+
+def codec_preset(codec_args):
+    """Returns the x264 preset named in encoder arguments."""
+    if "-preset" in codec_args:
+        return codec_args[codec_args.index("-preset") + 1]
+    return DEFAULT_PRESET
+
+
+def with_preset(codec_args, preset):
+    """Returns a copy of encoder arguments that uses the given x264 preset."""
+    codec_args = list(codec_args)
+    if "-preset" in codec_args:
+        codec_args[codec_args.index("-preset") + 1] = preset
+    else:
+        codec_args[2:2] = ["-preset", preset]  # After "-c:v libx264"
+    return codec_args
+
+
+def time_segments(image_files, audio_files, motion, label):
+    """
+    Encodes the panels as still images or with motion and returns
+    (seconds taken, total bytes written).
+    """
+    create_movie.MOTION_MODE = motion
+    create_movie.TEMP_VIDEO_DIR = os.path.join(BENCHMARK_DIR, label)
+    start_time = time.perf_counter()
+    segments = create_movie.create_video_segments(image_files, audio_files)
+    elapsed = time.perf_counter() - start_time
+    if len(segments) != len(image_files):
+        print("❌ Some segments failed to encode; timings are not comparable.")
+    return elapsed, sum(os.path.getsize(path) for path in segments)
+
+
+def main():
+    """
+    Times Ken Burns motion encoding against plain stillimage encoding. The
+    target is checked against still encoding at the motion preset, so speed
+    bought with a faster preset is not counted as motion being cheap.
+    """
+    if not create_movie.check_ffmpeg():
+        return
+
+    image_files = sorted(glob.glob(os.path.join(create_movie.FRAMES_DIR, "*.jpg")))
+    audio_files = sorted(glob.glob(os.path.join(create_movie.AUDIO_DIR, "*.wav")))
+    image_files = image_files[:PANEL_COUNT]
+    audio_files = audio_files[:PANEL_COUNT]
+    if not image_files or len(image_files) != len(audio_files):
+        print("Error: Mismatch in number of image and audio files, or folders are empty.")
+        return
+
+    still_args = create_movie.VIDEO_CODEC_ARGS
+    still_preset = codec_preset(still_args)
+    motion_preset = codec_preset(create_movie.MOTION_CODEC_ARGS)
+    results = {}
+    try:
+        results[f"Still image ({still_preset})"] = time_segments(
+            image_files, audio_files, False, "still"
+        )
+        if motion_preset != still_preset:
+            create_movie.VIDEO_CODEC_ARGS = with_preset(still_args, motion_preset)
+            results[f"Still image ({motion_preset})"] = time_segments(
+                image_files, audio_files, False, "still_matched"
+            )
+            create_movie.VIDEO_CODEC_ARGS = still_args
+        results[f"Ken Burns ({motion_preset})"] = time_segments(
+            image_files, audio_files, True, "motion"
+        )
+    finally:
+        create_movie.VIDEO_CODEC_ARGS = still_args
+        shutil.rmtree(BENCHMARK_DIR, ignore_errors=True)
+
+    matched_seconds = results[f"Still image ({motion_preset})"][0]
+    motion_seconds = results[f"Ken Burns ({motion_preset})"][0]
+    ratio = motion_seconds / matched_seconds
+    print(f"\n--- Motion benchmark ({len(image_files)} panels) ---")
+    for label, (seconds, size) in results.items():
+        print(f"{label + ':':<24} {seconds:6.2f}s, {format_bytes(size)}")
+    print(f"Ken Burns vs still at the same preset: {ratio:.2f}x")
+    if ratio <= TARGET_RATIO:
+        print(f"✅ Within the {TARGET_RATIO:.1f}x target.")
+    else:
+        print(f"❌ Above the {TARGET_RATIO:.1f}x target.")
+
+
+if __name__ == "__main__":
+    main()
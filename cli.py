@@ -0,0 +1,387 @@
+import argparse
+import glob
+import math
+import os
+
+# Only the standard library is imported here. The generation scripts import
+# replicate, requests, dotenv and numpy lazily, and create_movie needs none of
+# them, so `movie` and `--dry-run` start instantly and need no API token.
+
+# Rough wall-clock estimates used by --dry-run
+FRAME_PREDICTION_SECONDS = 20
+AUDIO_PREDICTION_SECONDS = 8
+SEGMENT_ENCODE_SECONDS = 2
+
+
+def format_seconds(seconds):
+    """Formats a duration as e.g. '2m 05s'."""
+    minutes, seconds = divmod(int(math.ceil(seconds)), 60)
+    return f"{minutes}m {seconds:02d}s" if minutes else f"{seconds}s"
+
+
+def parse_frame_ranges(text):
+    """Parses e.g. '3-5,12' into a set of 0-based frame indices."""
+    import create_audio
+
+    frame_count = len(create_audio.COMIC_SCRIPT)
+    indices = set()
+    for item in text.split(","):
+        try:
+            first, _, last = item.strip().partition("-")
+            first = int(first)
+            last = int(last) if last else first
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid frame range: '{item}'")
+        if first < 1 or last < first:
+            raise argparse.ArgumentTypeError(f"invalid frame range: '{item}'")
+        if last > frame_count:
+            raise argparse.ArgumentTypeError(
+                f"frame range '{item}' is out of range; the script has {frame_count} frames"
+            )
+        indices.update(range(first - 1, last))
+    return indices
+
+
+def parse_roles(text):
+    """Parses e.g. 'him,her' into a set of script roles."""
+    import create_audio
+
+    roles = {role.strip() for role in text.split(",")}
+    unknown = sorted(roles - set(create_audio.VOICES))
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"unknown role(s): {', '.join(unknown)} (choose from {', '.join(create_audio.VOICES)})"
+        )
+    return roles
+
+
+def parse_transition(text):
+    """Parses a crossfade length in seconds; negative lengths are rejected."""
+    try:
+        seconds = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid transition length: '{text}'")
+    if not math.isfinite(seconds) or seconds < 0:
+        raise argparse.ArgumentTypeError(
+            f"transition length must be 0 or more seconds, got '{text}'"
+        )
+    return seconds
+
+
+def resolve_selection(args):
+    """
+    Returns (frames, roles) from the selectors: the set of selected frame
+    indices (from --frames and --image-key) and the set of selected roles.
+    Either is None when not restricted.
+    """
+    frames = args.frames
+    if args.image_key:
+        import create_frames
+
+        keyed = {
+            i
+            for i, prompt_data in enumerate(create_frames.COMIC_PROMPTS)
+            if prompt_data["image_key"] == args.image_key
+        }
+        frames = keyed if frames is None else frames & keyed
+    return frames, args.roles
+
+
+def plan_frames(force, frames=None, roles=None):
+    """Returns (jobs, cache_hits, estimated_seconds) for frame generation."""
+    import create_frames
+
+    selective = frames is not None or roles is not None
+    jobs, hits = [], []
+    for i, prompt_data in enumerate(create_frames.COMIC_PROMPTS):
+        path = create_frames.frame_image_path(i)
+        if selective:
+            # Roles select lines, so a role selector leaves the images alone
+            selected = roles is None and i in frames
+        else:
+            selected = force or not os.path.exists(path)
+        if selected:
+            jobs.append(f"{path} (image_key={prompt_data['image_key']})")
+        elif os.path.exists(path):
+            hits.append(path)
+    waves = math.ceil(len(jobs) / create_frames.THREAD_POOL_SIZE)
+    return jobs, hits, waves * FRAME_PREDICTION_SECONDS
+
+
+def plan_audio(force, frames=None, roles=None):
+    """
+    Returns (jobs, cache_hits, estimated_seconds, skipped) for audio generation.
+    `skipped` lists selected frames that create_audio will refuse because an
+    unselected line has no saved part to reuse.
+    """
+    import create_audio
+
+    selective = frames is not None or roles is not None
+    jobs, hits, skipped = [], [], []
+    longest_frame = 0
+    for i, frame_script in enumerate(create_audio.COMIC_SCRIPT):
+        path = create_audio.frame_audio_path(i)
+        lines = {
+            k
+            for k, part in enumerate(frame_script)
+            if roles is None or part["role"] in roles
+        }
+        if selective:
+            selected = (frames is None or i in frames) and lines
+        else:
+            selected = force or not os.path.exists(path)
+        if selected and roles is not None:
+            missing = create_audio.missing_unselected_parts(frame_script, i, lines)
+            if missing:
+                missing_roles = ", ".join(frame_script[k]["role"] for k in missing)
+                skipped.append(f"{path} (no saved audio for: {missing_roles})")
+                selected = False
+        if not selected:
+            if os.path.exists(path):
+                hits.append(path)
+            continue
+        line_roles = [frame_script[k]["role"] for k in sorted(lines)]
+        jobs.append(f"{path} ({len(lines)} lines: {', '.join(line_roles)})")
+        longest_frame = max(longest_frame, len(lines))
+    # Each worker generates one frame's lines sequentially
+    waves = math.ceil(len(jobs) / create_audio.THREAD_POOL_SIZE)
+    return jobs, hits, waves * longest_frame * AUDIO_PREDICTION_SECONDS, skipped
+
+
+def job_frame_index(job):
+    """Returns the frame index encoded in a planned frame or audio output path."""
+    path = job.split(" ")[0]
+    return int(os.path.splitext(path)[0].rsplit("_", 1)[1]) - 1
+
+
+def plan_movie(force, regenerated):
+    """
+    Returns (jobs, cache_hits, estimated_seconds) for the movie render.
+    `regenerated` is the set of frame indices whose image or audio will change.
+    """
+    import create_movie
+
+    image_files = sorted(glob.glob(os.path.join(create_movie.FRAMES_DIR, "*.jpg")))
+    audio_files = sorted(glob.glob(os.path.join(create_movie.AUDIO_DIR, "*.wav")))
+    segment_count = max(len(image_files), max(regenerated, default=-1) + 1)
+    reuse_segments = not force and create_movie.segment_cache_valid()
+    if create_movie.MULTI_RENDITION:
+        outputs = [
+            create_movie.rendition_output_filename(name)
+            for name in create_movie.RENDITIONS
+        ]
+        segment_dirs = [
+            os.path.join(create_movie.TEMP_VIDEO_DIR, name)
+            for name in create_movie.RENDITIONS
+        ]
+    else:
+        outputs = [create_movie.OUTPUT_FILENAME]
+        segment_dirs = [create_movie.TEMP_VIDEO_DIR]
+
+    jobs, hits = [], []
+    for i in range(segment_count):
+        segment_paths = [
+            os.path.join(segment_dir, f"segment_{i + 1:02d}.mp4")
+            for segment_dir in segment_dirs
+        ]
+        if (
+            reuse_segments
+            and i not in regenerated
+            and i < min(len(image_files), len(audio_files))
+            and create_movie.segment_is_current(
+                image_files[i], audio_files[i], segment_paths
+            )
+        ):
+            hits.append(segment_paths[0])
+        else:
+            jobs.append(segment_paths[0])
+    encodes = len(jobs)
+    jobs += outputs
+    if create_movie.STREAMING_OUTPUT:
+        jobs.append(create_movie.HLS_PLAYLIST)
+    return jobs, hits, encodes * SEGMENT_ENCODE_SECONDS
+
+
+def print_plan(stage, jobs, hits, estimated_seconds, skipped=()):
+    """Prints the planned jobs, cache hits and refused jobs of one stage."""
+    print(f"\n--- {stage}: {len(jobs)} jobs, {len(hits)} cache hits ---")
+    for job in jobs:
+        print(f"   - {job}")
+    for job in skipped:
+        print(f"   ! Skipped {job}; select the whole frame with --frames instead")
+    print(f"   Estimated time: {format_seconds(estimated_seconds)}")
+
+
+def configure_movie(args):
+    """Applies the movie command-line options to create_movie's settings."""
+    import create_movie
+
+    if args.hls:
+        create_movie.STREAMING_OUTPUT = True
+    if args.renditions:
+        create_movie.MULTI_RENDITION = True
+    if args.motion:
+        create_movie.MOTION_MODE = True
+    if args.transition is not None:
+        create_movie.TRANSITION_DURATION = args.transition
+    # Segments are cached between CLI runs; only changed panels are re-encoded
+    create_movie.KEEP_SEGMENTS = True
+
+
+def run(args):
+    """Runs (or, with --dry-run, plans) the stages selected by the subcommand."""
+    stages = ["frames", "audio", "movie"] if args.command == "all" else [args.command]
+    if args.max_disk_mb is not None or args.max_memory_mb is not None:
+        from resource_governor import governor
+
+        if args.max_disk_mb is not None:
+            governor.max_disk_bytes = args.max_disk_mb * 1024**2
+        if args.max_memory_mb is not None:
+            governor.max_memory_bytes = args.max_memory_mb * 1024**2
+    frames, roles = resolve_selection(args)
+    selective = frames is not None or roles is not None
+    audio_frames = frames
+    if args.command == "all" and frames is not None and roles is None:
+        # In `all`, a frame selector redraws panels only; re-recording their
+        # dialogue takes a line selector (--roles)
+        audio_frames = set()
+    if "movie" in stages:
+        configure_movie(args)
+
+    if args.dry_run:
+        total_seconds = 0
+        regenerated = set()
+        if "frames" in stages:
+            jobs, hits, seconds = plan_frames(args.force, frames, roles)
+            print_plan("Frames", jobs, hits, seconds)
+            total_seconds += seconds
+            regenerated.update(job_frame_index(job) for job in jobs)
+        if "audio" in stages:
+            jobs, hits, seconds, skipped = plan_audio(
+                args.force, audio_frames, roles
+            )
+            print_plan("Audio", jobs, hits, seconds, skipped)
+            total_seconds += seconds
+            regenerated.update(job_frame_index(job) for job in jobs)
+        if "movie" in stages:
+            jobs, hits, seconds = plan_movie(args.force, regenerated)
+            print_plan("Movie", jobs, hits, seconds)
+            total_seconds += seconds
+        print(
+            f"\nDry run only, nothing was generated. Estimated total: {format_seconds(total_seconds)}"
+        )
+        return
+
+    # Explicitly selected frames and lines are always regenerated
+    skip_existing = not args.force and not selective
+    if "frames" in stages and roles is None:
+        import create_audio
+        import create_frames
+
+        # Frame generation shares the .env token handling of create_audio
+        create_audio.require_api_token()
+        create_frames.create_comic_story(
+            create_frames.COMIC_PROMPTS,
+            create_frames.IMAGE_URLS,
+            create_frames.OUTPUT_DIR,
+            skip_existing=skip_existing,
+            frames=frames,
+        )
+    if "audio" in stages and audio_frames != set():
+        import create_audio
+
+        create_audio.main(
+            skip_existing=skip_existing, frames=audio_frames, roles=roles
+        )
+    if "movie" in stages:
+        import create_movie
+
+        if args.force:
+            create_movie.cleanup()
+        create_movie.main()
+
+    from resource_governor import governor
+
+    governor.report()
+
+
+def main():
+    """Parses the command line and dispatches to the selected subcommand."""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="print planned jobs, cache hits and estimated time without running them",
+    )
+    common.add_argument(
+        "--force",
+        action="store_true",
+        help="regenerate outputs that already exist instead of reusing them",
+    )
+    common.add_argument(
+        "--max-disk-mb",
+        type=int,
+        metavar="MB",
+        help="disk budget; concurrent predictions pause when it is reached, "
+        "sequential encodes only warn",
+    )
+    common.add_argument(
+        "--max-memory-mb",
+        type=int,
+        metavar="MB",
+        help="memory budget for large buffers (decoded panels, PCM); concurrent "
+        "predictions pause when it is reached, sequential encodes only warn",
+    )
+    common.add_argument(
+        "--frames",
+        type=parse_frame_ranges,
+        metavar="RANGES",
+        help="only regenerate these frames, e.g. '3-5,12' (with `all`, only their "
+        "images unless --roles is given)",
+    )
+    common.add_argument(
+        "--roles",
+        type=parse_roles,
+        metavar="ROLES",
+        help="only regenerate lines by these roles, e.g. 'him,her'",
+    )
+    common.add_argument(
+        "--image-key",
+        choices=["him", "her", "both"],
+        help="only regenerate frames whose prompt uses this base image",
+    )
+
+    movie_options = argparse.ArgumentParser(add_help=False)
+    movie_options.add_argument(
+        "--hls", action="store_true", help="also publish an HLS playlist while encoding"
+    )
+    movie_options.add_argument(
+        "--renditions",
+        action="store_true",
+        help="encode every size in RENDITIONS from one decode pass",
+    )
+    movie_options.add_argument(
+        "--motion", action="store_true", help="slow Ken Burns pan/zoom on each panel"
+    )
+    movie_options.add_argument(
+        "--transition",
+        type=parse_transition,
+        metavar="SECONDS",
+        help="crossfade length between panels (0 for hard cuts)",
+    )
+
+    parser = argparse.ArgumentParser(description="Teach Me Tender comic pipeline.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("frames", parents=[common], help="generate comic frames")
+    subparsers.add_parser("audio", parents=[common], help="generate frame audio")
+    subparsers.add_parser(
+        "movie", parents=[common, movie_options], help="render the movie"
+    )
+    subparsers.add_parser(
+        "all", parents=[common, movie_options], help="frames, audio, then movie"
+    )
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,31 @@
-import replicate
-import requests
 import os
+import shutil
 import subprocess
 import time
-from dotenv import load_dotenv
 import concurrent.futures
 import threading
+from resource_governor import governor
 
-# --- Configuration ---
-load_dotenv()
-if not os.getenv("REPLICATE_API_TOKEN"):
-    raise Exception("Replicate API token not found. Please set it in a .env file.")
+# replicate, requests, dotenv and numpy (audio_tools) are imported where they
+# are used, so the script data can be read without a token or network access.
 
+# --- Configuration ---
 VOICES = {"narrator": "Ember", "him": "Orion", "her": "Aurora"}
 AUDIO_OUTPUT_DIR = "comic_audio"
 TEMP_DIR = "temp_audio_parts"
 THREAD_POOL_SIZE = 8
+NORMALIZE_LOUDNESS = True  # Level-match the voices, line by line, before combining
 lock = threading.Lock()
 
+# --- Resource budget: reserved with the resource governor per frame ---
+LINE_DISK_ESTIMATE = 1024**2  # Downloaded WAV per line
+LINE_MEMORY_ESTIMATE = 8 * 1024**2  # NumPy buffers while trimming one part
+
+# --- Pacing: trim TTS silence, keeping this much around each utterance ---
+TRIM_SILENCE = True
+HEAD_PADDING_SECONDS = 0.05
+TAIL_PADDING_SECONDS = 0.15
+
 # --- Retry Configuration for Network Errors ---
 RETRY_COUNT = 3
 RETRY_DELAY_SECONDS = 2
@@ -227,6 +235,20 @@ COMIC_SCRIPT = [
 ]
 
 
+def require_api_token():
+    """Loads .env and fails early if the Replicate API token is missing."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    if not os.getenv("REPLICATE_API_TOKEN"):
+        raise Exception("Replicate API token not found. Please set it in a .env file.")
+
+
+def frame_audio_path(index):
+    """Returns the output path of the audio for the frame at `index`."""
+    return os.path.join(AUDIO_OUTPUT_DIR, f"audio_frame_{index + 1:02d}.wav")
+
+
 def safe_print(*args, **kwargs):
     """A thread-safe print function."""
     with lock:
@@ -235,6 +257,8 @@ def safe_print(*args, **kwargs):
 
 def generate_audio_with_retries(role, text):
     """Calls the Replicate API with a retry mechanism for network errors."""
+    import replicate
+
     voice = VOICES.get(role)
     if not voice:
         raise ValueError(f"No voice defined for role: {role}")
@@ -269,6 +293,8 @@ def generate_audio_with_retries(role, text):
 
 def download_file(url, destination):
     """Downloads a file from a URL to a local path."""
+    import requests
+
     try:
         response = requests.get(url, stream=True)
         response.raise_for_status()
@@ -321,76 +347,249 @@ def combine_audio_with_ffmpeg(input_files, output_file):
             os.remove(list_filename)
 
 
-def process_frame_audio(frame_script, index):
-    """Worker function to process all audio for a single frame."""
+def trim_audio_part(path):
+    """Trims leading/trailing TTS silence from a downloaded part. Returns seconds saved."""
+    if not TRIM_SILENCE:
+        return 0.0
+    from audio_tools import trim_silence
+
+    try:
+        return trim_silence(path, HEAD_PADDING_SECONDS, TAIL_PADDING_SECONDS)
+    except ValueError as e:
+        safe_print(f"   - Could not trim silence from {os.path.basename(path)}: {e}")
+        return 0.0
+
+
+def part_audio_path(index, part_index):
+    """
+    Returns the path of one line's audio within a frame. Parts are kept
+    unleveled after combining, so a single line can be regenerated later and
+    every voice can be measured over the whole episode.
+    """
+    return os.path.join(
+        TEMP_DIR, f"temp_frame_{index + 1:02d}_part_{part_index + 1}.wav"
+    )
+
+
+def missing_unselected_parts(frame_script, index, lines):
+    """
+    Returns the indices of lines outside `lines` whose saved part is missing.
+    Such lines could only be kept by re-recording them, which a line selection
+    must never do.
+    """
+    return [
+        i
+        for i in range(len(frame_script))
+        if i not in lines and not os.path.exists(part_audio_path(index, i))
+    ]
+
+
+def process_frame_audio(frame_script, index, lines=None):
+    """
+    Worker function to generate the audio parts of a single frame.
+    If `lines` is given, only those line indices are regenerated and the other
+    lines are reused from their saved parts; the frame is skipped if any of
+    those parts is missing.
+    Returns (seconds of silence trimmed from its parts, whether every part
+    of the frame is now available to combine).
+    """
     frame_number = index + 1
     safe_print(f"[Thread] Processing Frame {frame_number:02d}...")
 
     if not frame_script:
         safe_print(f"[Thread] Frame {frame_number:02d} has no script. Skipping.")
-        return
-
-    audio_parts = []
-    for i, part in enumerate(frame_script):
-        safe_print(
-            f"   - Generating audio for frame {frame_number:02d}, part {i + 1} ('{part['role']}')"
-        )
-        url = generate_audio_with_retries(part["role"], part["text"])
-        if url:
-            audio_parts.append({"url": url, "index": i})
-        else:
+        return 0.0, False
+
+    if lines is not None:
+        missing = missing_unselected_parts(frame_script, index, lines)
+        if missing:
+            missing_lines = ", ".join(
+                f"{i + 1} ('{frame_script[i]['role']}')" for i in missing
+            )
             safe_print(
-                f"[ERROR] Could not generate required audio for frame {frame_number:02d}. Aborting this frame."
+                f"[ERROR] Frame {frame_number:02d} has no saved audio for unselected line(s) {missing_lines}. "
+                f"Regenerate the whole frame with --frames {frame_number} (without --roles). Skipping."
             )
-            return
+            return 0.0, False
 
-    final_output_path = os.path.join(
-        AUDIO_OUTPUT_DIR, f"audio_frame_{frame_number:02d}.wav"
-    )
+    # Waits here while the disk/memory budget is exhausted (backpressure)
+    with governor.reserve(
+        "audio",
+        disk_bytes=LINE_DISK_ESTIMATE * len(frame_script),
+        memory_bytes=LINE_MEMORY_ESTIMATE,
+    ) as reservation:
+        audio_parts = []
+        for i, part in enumerate(frame_script):
+            if lines is not None and i not in lines:
+                safe_print(
+                    f"   - Reusing audio for frame {frame_number:02d}, part {i + 1} ('{part['role']}')"
+                )
+                governor.add_file("audio", part_audio_path(index, i))
+                continue
+            safe_print(
+                f"   - Generating audio for frame {frame_number:02d}, part {i + 1} ('{part['role']}')"
+            )
+            url = generate_audio_with_retries(part["role"], part["text"])
+            if url:
+                audio_parts.append({"url": url, "index": i})
+            else:
+                safe_print(
+                    f"[ERROR] Could not generate required audio for frame {frame_number:02d}. Aborting this frame."
+                )
+                return 0.0, False
 
-    if len(audio_parts) == 1:
-        if download_file(audio_parts[0]["url"], final_output_path):
-            safe_print(f"[SUCCESS] Frame {frame_number:02d} audio saved.")
-    else:
-        temp_files = []
-        try:
-            for part in audio_parts:
-                temp_path = os.path.join(
-                    TEMP_DIR,
-                    f"temp_frame_{frame_number:02d}_part_{part['index'] + 1}.wav",
+        seconds_saved = 0.0
+        for part in audio_parts:
+            temp_path = part_audio_path(index, part["index"])
+            if download_file(part["url"], temp_path):
+                seconds_saved += trim_audio_part(temp_path)
+                governor.add_file("audio", temp_path, reservation=reservation)
+            else:
+                safe_print(
+                    f"[ERROR] Failed to download temp file for frame {frame_number:02d}. Aborting this frame."
                 )
-                if download_file(part["url"], temp_path):
-                    temp_files.append(temp_path)
-                else:
-                    safe_print(
-                        f"[ERROR] Failed to download temp file for frame {frame_number:02d}. Aborting combine."
-                    )
-                    return
-
-            if len(temp_files) == len(audio_parts):
-                if combine_audio_with_ffmpeg(temp_files, final_output_path):
-                    safe_print(
-                        f"[SUCCESS] Frame {frame_number:02d} audio combined and saved."
-                    )
+                # Never leave a partial download behind to be reused later
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                return seconds_saved, False
+        return seconds_saved, True
+
+
+def build_frame_audio(frame_script, index, gains=None):
+    """
+    Writes a frame's final audio from its saved parts. With `gains`
+    ({part path: gain_db}) each part is leveled first, so the voices inside a
+    multi-line frame are matched as well. Returns True on success.
+    """
+    frame_number = index + 1
+    part_paths = [part_audio_path(index, i) for i in range(len(frame_script))]
+    if not part_paths or not all(os.path.exists(path) for path in part_paths):
+        safe_print(f"[ERROR] Frame {frame_number:02d} is missing audio parts. Skipping.")
+        return False
+    final_output_path = frame_audio_path(index)
+
+    leveled_paths = []
+    if gains is not None:
+        leveled_paths = [
+            os.path.splitext(path)[0] + "_leveled.wav" for path in part_paths
+        ]
+    input_paths = list(leveled_paths or part_paths)
+    parts_size = sum(os.path.getsize(path) for path in part_paths)
+    # Leveled copies plus the combined file
+    with governor.reserve(
+        "audio", disk_bytes=2 * parts_size, memory_bytes=LINE_MEMORY_ESTIMATE
+    ) as reservation:
+        try:
+            if gains is not None:
+                from audio_tools import write_with_gain
+
+                for k, (part_path, leveled_path) in enumerate(
+                    zip(part_paths, leveled_paths)
+                ):
+                    try:
+                        write_with_gain(
+                            part_path, leveled_path, gains.get(part_path, 0.0)
+                        )
+                    except ValueError as e:
+                        # Unreadable for NumPy; ffmpeg can still combine it as is
+                        safe_print(
+                            f"   - Could not level {os.path.basename(part_path)}: {e}"
+                        )
+                        input_paths[k] = part_path
+            if len(input_paths) == 1:
+                shutil.copyfile(input_paths[0], final_output_path)
+                success = True
+            else:
+                success = combine_audio_with_ffmpeg(input_paths, final_output_path)
         finally:
-            for temp_file in temp_files:
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
+            for leveled_path in leveled_paths:
+                if os.path.exists(leveled_path):
+                    os.remove(leveled_path)
+        if success:
+            governor.add_file("audio", final_output_path, reservation=reservation)
+            safe_print(f"[SUCCESS] Frame {frame_number:02d} audio saved.")
 
+    # Parts stay non-reclaimable: --roles needs every unselected line's part
+    for part_path in part_paths:
+        governor.add_file("audio", part_path)
+    return success
 
-def main():
-    """Main function to orchestrate the audio generation process."""
+
+def main(skip_existing=False, frames=None, roles=None):
+    """
+    Main function to orchestrate the audio generation process.
+    With `skip_existing`, frames whose audio file already exists are not regenerated.
+    `frames` (a set of frame indices) and `roles` (a set of roles) restrict
+    generation to the selected frames and, within them, to lines by those roles.
+    """
+    require_api_token()
     print("--- Starting Final Comic Audio Generation ---")
     os.makedirs(AUDIO_OUTPUT_DIR, exist_ok=True)
     os.makedirs(TEMP_DIR, exist_ok=True)
     print(f"Audio will be saved to: '{AUDIO_OUTPUT_DIR}'")
 
+    jobs = []
+    for i, frame_script in enumerate(COMIC_SCRIPT):
+        if frames is not None and i not in frames:
+            continue
+        if skip_existing and os.path.exists(frame_audio_path(i)):
+            continue
+        lines = None
+        if roles is not None:
+            lines = {k for k, part in enumerate(frame_script) if part["role"] in roles}
+            if not lines:
+                continue
+        jobs.append((i, lines))
+    print(f"Generating audio for {len(jobs)}/{len(COMIC_SCRIPT)} frames.")
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=THREAD_POOL_SIZE
+    ) as executor:
+        futures = {
+            executor.submit(process_frame_audio, COMIC_SCRIPT[i], i, lines): i
+            for i, lines in jobs
+        }
+        seconds_saved = 0.0
+        generated = []
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                frame_seconds_saved, success = future.result()
+            except Exception as e:
+                safe_print(f"[FATAL ERROR] A thread raised an unhandled exception: {e}")
+                continue
+            seconds_saved += frame_seconds_saved
+            if success:
+                generated.append(futures[future])
+
+    if TRIM_SILENCE:
+        print(f"\n✂️  Trimmed {seconds_saved:.2f}s of silence from the episode runtime.")
+
+    gains = None
+    if NORMALIZE_LOUDNESS:
+        from audio_tools import TARGET_LUFS, loudness_gains
+
+        print("\n--- Measuring speaker loudness across the episode ---")
+        # Each part holds one speaker's line. Saved parts of frames outside this
+        # run are measured too, so every voice is leveled by its whole episode.
+        part_paths = []
+        speakers = []
+        for i, frame_script in enumerate(COMIC_SCRIPT):
+            for k, part in enumerate(frame_script):
+                path = part_audio_path(i, k)
+                if os.path.exists(path):
+                    part_paths.append(path)
+                    speakers.append(VOICES[part["role"]])
+        gains = loudness_gains(part_paths, speakers)
+        print(f"Leveling parts to {TARGET_LUFS:.1f} LUFS before combining.")
+
+    print("\n--- Combining frame audio ---")
     with concurrent.futures.ThreadPoolExecutor(
         max_workers=THREAD_POOL_SIZE
     ) as executor:
         futures = [
-            executor.submit(process_frame_audio, script, i)
-            for i, script in enumerate(COMIC_SCRIPT)
+            executor.submit(build_frame_audio, COMIC_SCRIPT[i], i, gains)
+            # Frames with a failed line keep their previous audio untouched
+            for i in sorted(generated)
         ]
         for future in concurrent.futures.as_completed(futures):
             try:
@@ -403,3 +602,4 @@ def main():
 
 if __name__ == "__main__":
     main()
+    governor.report()
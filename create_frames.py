@@ -1,7 +1,9 @@
-import replicate
-import requests
 import os
 import concurrent.futures
+from resource_governor import governor
+
+# replicate and requests are imported inside the worker so the prompts can be
+# read (e.g. for a dry run) without network dependencies.
 
 
 # Base images for the characters
@@ -21,6 +23,8 @@ IMAGE_URLS = {
 OUTPUT_DIR = "comic_frames"
 # Number of parallel threads for API calls
 THREAD_POOL_SIZE = 8
+# Disk reserved with the resource governor for each image before it is generated
+FRAME_DISK_ESTIMATE = 2 * 1024**2
 
 # --- Prompts for the Comic Book Story ---
 # Each dictionary contains the prompt text and the key for the base image to use.
@@ -156,45 +160,57 @@ COMIC_PROMPTS = [
 ]
 
 
+def frame_image_path(index, output_dir=OUTPUT_DIR):
+    """Returns the output path of the image for the frame at `index`."""
+    return os.path.join(output_dir, f"frame_{index + 1:02d}.jpg")
+
+
 def generate_and_save_image(prompt_data, index, image_urls, output_dir):
     """
     Worker function to be run in a thread.
     Calls the Replicate API and saves the resulting image.
     """
+    import replicate
+    import requests
+
     prompt_text = prompt_data["prompt"]
     image_key = prompt_data["image_key"]
     input_image_url = image_urls[image_key]
 
     frame_number = index + 1
-    output_filename = os.path.join(output_dir, f"frame_{frame_number:02d}.jpg")
+    output_filename = frame_image_path(index, output_dir)
 
     print(f"[Thread] Starting generation for frame {frame_number}...")
 
     try:
-        # Call the Replicate API
-        output_url = replicate.run(
-            "black-forest-labs/flux-kontext-pro",
-            input={
-                "prompt": prompt_text,
-                "input_image": input_image_url,
-                "aspect_ratio": "match_input_image",  # Maintain aspect ratio of base image
-                "output_format": "jpg",
-                "safety_tolerance": 6,  # Slightly more lenient for artistic styles
-                # "prompt_strength": 8.5,  # How much to change the original image
-            },
-        )
-
-        print(f"[Thread] Frame {frame_number} generated. URL: {output_url}")
-
-        # Download the image from the returned URL
-        response = requests.get(output_url, stream=True)
-        response.raise_for_status()  # Raise an exception for bad status codes
-
-        with open(output_filename, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-
-        print(f"[Thread] Frame {frame_number} saved successfully as {output_filename}")
+        # Waits here while the disk budget is exhausted (backpressure)
+        with governor.reserve("frames", disk_bytes=FRAME_DISK_ESTIMATE) as reservation:
+            # Call the Replicate API
+            output_url = replicate.run(
+                "black-forest-labs/flux-kontext-pro",
+                input={
+                    "prompt": prompt_text,
+                    "input_image": input_image_url,
+                    "aspect_ratio": "match_input_image",  # Maintain aspect ratio of base image
+                    "output_format": "jpg",
+                    "safety_tolerance": 6,  # Slightly more lenient for artistic styles
+                    # "prompt_strength": 8.5,  # How much to change the original image
+                },
+            )
+
+            print(f"[Thread] Frame {frame_number} generated. URL: {output_url}")
+
+            # Download the image from the returned URL
+            response = requests.get(output_url, stream=True)
+            response.raise_for_status()  # Raise an exception for bad status codes
+
+            with open(output_filename, "wb") as f:
+                for chunk in response.iter_content(chunk_size=8192):
+                    f.write(chunk)
+
+            print(f"[Thread] Frame {frame_number} saved successfully as {output_filename}")
+            governor.add_file("frames", output_filename, reservation=reservation)
+
         return True
 
     except Exception as e:
@@ -202,9 +218,13 @@ def generate_and_save_image(prompt_data, index, image_urls, output_dir):
         return False
 
 
-def create_comic_story(prompts, image_urls, output_dir):
+def create_comic_story(
+    prompts, image_urls, output_dir, skip_existing=False, frames=None
+):
     """
     Main function to orchestrate the comic generation process.
+    With `skip_existing`, frames whose image already exists are not regenerated.
+    `frames` (a set of frame indices) restricts generation to those frames.
     """
     # Create the output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
@@ -222,6 +242,8 @@ def create_comic_story(prompts, image_urls, output_dir):
                 generate_and_save_image, prompt_data, i, image_urls, output_dir
             ): i
             for i, prompt_data in enumerate(prompts)
+            if (frames is None or i in frames)
+            and not (skip_existing and os.path.exists(frame_image_path(i, output_dir)))
         }
 
         # Wait for all futures to complete
@@ -237,3 +259,4 @@ def create_comic_story(prompts, image_urls, output_dir):
 
 if __name__ == "__main__":
     create_comic_story(COMIC_PROMPTS, IMAGE_URLS, OUTPUT_DIR)
+    governor.report()
@@ -2,7 +2,13 @@ import os
 import subprocess
 import glob
 import json
+import math
 import shutil
+import tempfile
+from resource_governor import governor
+
+# numpy is only needed for MOTION_MODE and is imported there, so the default
+# still-image path keeps create_movie free of third-party dependencies.
 
 # --- Configuration ---
 FRAMES_DIR = "comic_frames"
@@ -10,9 +16,73 @@ AUDIO_DIR = "comic_audio"
 TEMP_VIDEO_DIR = "temp_video_segments"
 OUTPUT_FILENAME = "comic_slideshow_final.mp4"  # New name to avoid confusion
 
+# Streaming output: publish each segment to an HLS (fragmented MP4) playlist as
+# soon as it is encoded, so playback can start before the full render finishes.
+STREAMING_OUTPUT = False
+HLS_DIR = "comic_slideshow_hls"  # Kept after cleanup, unlike TEMP_VIDEO_DIR
+HLS_PLAYLIST = os.path.join(HLS_DIR, "index.m3u8")
+HLS_SEGMENT_SECONDS = 4  # Keyframe interval and HLS chunk length
+
+# Multi-rendition output: decode every frame and audio file once and encode all
+# sizes in the same ffmpeg run. Streaming output uses the first rendition.
+MULTI_RENDITION = False
+RENDITIONS = {"master": "1024x1024", "720p": "720x720", "mobile": "480x480"}
+
+# Silence allowed after each panel's audio before the segment ends
+SEGMENT_AUDIO_BUFFER = 0.1
+
+# Disk reserved with the resource governor per second of each segment encode
+SEGMENT_DISK_BYTES_PER_SECOND = 256 * 1024
+
+# Keep encoded segments between runs and re-encode only those whose frame or
+# audio changed since, so fixing one panel costs one segment encode.
+KEEP_SEGMENTS = False
+SEGMENT_SETTINGS_FILE = os.path.join(TEMP_VIDEO_DIR, "settings.json")
+
+# Crossfade transitions (seconds). Only a window of this length around each cut
+# is re-encoded; the rest of every segment is stream-copied. 0 keeps hard cuts.
+TRANSITION_DURATION = 0.0
+
 # Video settings for each segment
 RESOLUTION = "1024x1024"
 FRAME_RATE = 30
+# Still-image encoder settings (see video_codec_args)
+VIDEO_CODEC_ARGS = [
+    "-c:v",
+    "libx264",  # Video codec
+    "-tune",
+    "stillimage",  # Optimize for static images
+    "-pix_fmt",
+    "yuv420p",  # Pixel format for broad compatibility
+    "-r",
+    str(FRAME_RATE),  # Set frame rate
+]
+
+# Ken Burns motion: a slow pan/zoom per panel. Crop trajectories are precomputed
+# with NumPy over a source upscaled once per panel, and the frames are piped to
+# the encoder raw, avoiding ffmpeg's (very slow) zoompan filter.
+MOTION_MODE = False
+MOTION_MAX_ZOOM = 1.15
+MOTION_SUPERSAMPLE = 2  # Source is rendered at this multiple of the output size
+MOTION_CODEC_ARGS = [
+    "-c:v",
+    "libx264",
+    "-preset",
+    "veryfast",  # Chosen with benchmark_motion.py: ~1.8x a still encode at the
+    # same preset; medium was ~3x, superfast barely faster at ~2.7x the bytes
+    "-pix_fmt",
+    "yuv420p",
+    "-r",
+    str(FRAME_RATE),
+]
+# (zoom_start, zoom_end, pan_x_start, pan_x_end, pan_y_start, pan_y_end); pan is
+# the crop position within the free margin (0 = left/top, 1 = right/bottom).
+MOTION_PATTERNS = [
+    (1.0, MOTION_MAX_ZOOM, 0.5, 0.5, 0.5, 0.5),  # Zoom in
+    (MOTION_MAX_ZOOM, 1.0, 0.5, 0.5, 0.5, 0.5),  # Zoom out
+    (MOTION_MAX_ZOOM, MOTION_MAX_ZOOM, 0.0, 1.0, 0.5, 0.5),  # Pan right
+    (MOTION_MAX_ZOOM, MOTION_MAX_ZOOM, 1.0, 0.0, 0.5, 0.5),  # Pan left
+]
 
 
 def check_ffmpeg():
@@ -68,15 +138,334 @@ def get_audio_duration(audio_path):
         return None
 
 
-def create_video_segments(image_files, audio_files):
-    """Creates individual video clips for each frame-audio pair. This part remains the same."""
+def transition_frames():
+    """Returns the crossfade length in whole frames (0 when transitions are off)."""
+    return round(TRANSITION_DURATION * FRAME_RATE)
+
+
+def keyframe_times(duration):
+    """
+    Returns the timestamps at which a segment must have keyframes:
+    every HLS_SEGMENT_SECONDS for streaming output, and at the end of the
+    crossfade window so the rest of the segment can be stream-copied.
+    """
+    times = set()
+    if STREAMING_OUTPUT:
+        times.update(range(0, int(duration) + 1, HLS_SEGMENT_SECONDS))
+    if transition_frames():
+        times.add(transition_frames() / FRAME_RATE)
+    return [f"{t:.3f}" for t in sorted(times)]
+
+
+def video_codec_args():
+    """
+    Returns the encoder settings shared by segments and re-encoded transitions,
+    so stream-copied pieces stay compatible when concatenated.
+    """
+    codec_args = MOTION_CODEC_ARGS if MOTION_MODE else VIDEO_CODEC_ARGS
+    if transition_frames():
+        # Without B-frames packets are stored in display order, so the
+        # `-frames:v` stream copies of the crossfade bodies cut on exact frames
+        codec_args = codec_args + ["-bf", "0"]
+    return codec_args
+
+
+def motion_size(outputs):
+    """Returns the (width, height) motion frames are rendered at: the largest output."""
+    sizes = [tuple(map(int, resolution.split("x"))) for resolution, _ in outputs]
+    return max(sizes, key=lambda size: size[0] * size[1])
+
+
+def build_segment_command(
+    img_path, audio_path, duration, outputs, shared_audio=False
+):
+    """
+    Builds the ffmpeg command for one frame-audio pair.
+    `outputs` is a list of (resolution, output_path). With several outputs the
+    inputs are decoded once and fanned out to one encoder each via `split`.
+    With `shared_audio`, `audio_path` is already AAC (see encode_segment_audio)
+    and is copied into every output instead of being encoded once per output.
+    In MOTION_MODE the video is read as raw frames from stdin instead.
+    """
+    command = ["ffmpeg"]
+    if MOTION_MODE:
+        width, height = motion_size(outputs)
+        command += [
+            "-f",
+            "rawvideo",
+            "-pix_fmt",
+            "yuv420p",
+            "-s",
+            f"{width}x{height}",
+            "-r",
+            str(FRAME_RATE),
+            "-i",
+            "pipe:0",  # Frames from encode_motion_segment
+        ]
+    else:
+        command += [
+            "-loop",
+            "1",  # Loop the input image
+            "-i",
+            img_path,  # Input image
+        ]
+    command += [
+        "-i",
+        audio_path,  # Input audio
+    ]
+
+    if len(outputs) > 1:
+        labels = "".join(f"[v{i}]" for i in range(len(outputs)))
+        filters = [f"[0:v]split={len(outputs)}{labels}"]
+        for i, (resolution, _) in enumerate(outputs):
+            width, height = resolution.split("x")
+            filters.append(f"[v{i}]scale={width}:{height}[out{i}]")
+        command += ["-filter_complex", ";".join(filters)]
+
+    for i, (resolution, output_path) in enumerate(outputs):
+        if len(outputs) > 1:
+            command += ["-map", f"[out{i}]", "-map", "1:a"]
+        else:
+            command += ["-s", resolution]  # Set video size
+        command += video_codec_args()
+        if shared_audio:
+            # -shortest would end the output ~1.5s early here: the copied audio
+            # runs out while x264's lookahead still holds video frames. End the
+            # video on the first frame boundary that covers the audio instead.
+            audio_seconds = duration - SEGMENT_AUDIO_BUFFER
+            command += [
+                "-c:a",
+                "copy",
+                "-frames:v",
+                str(math.ceil(audio_seconds * FRAME_RATE)),
+            ]
+        else:
+            command += [
+                "-c:a",
+                "aac",  # Audio codec
+                "-b:a",
+                "192k",  # Audio bitrate
+                "-shortest",  # Finish encoding when the shortest stream ends (the audio)
+                "-t",
+                str(duration),  # Explicitly set duration as a fallback
+            ]
+        forced_keyframes = keyframe_times(duration)
+        if forced_keyframes:
+            command += ["-force_key_frames", ",".join(forced_keyframes)]
+        command += [
+            "-y",  # Overwrite output file
+            output_path,
+        ]
+    return command
+
+
+def encode_segment_audio(audio_path, output_path):
+    """Encodes a panel's audio to AAC once, for copying into every rendition."""
+    command = [
+        "ffmpeg",
+        "-i",
+        audio_path,
+        "-c:a",
+        "aac",
+        "-b:a",
+        "192k",
+        "-y",
+        output_path,
+    ]
+    return subprocess.run(command, capture_output=True)
+
+
+def load_panel_planes(img_path, width, height):
+    """
+    Decodes a panel once, upscaled with lanczos to width x height, and returns
+    its Y, U and V planes (yuv420p) as uint8 arrays. This is the encoder's own
+    input format, so frames cropped from them are piped without conversion.
+    """
+    import numpy as np
+
+    command = [
+        "ffmpeg",
+        "-v",
+        "error",
+        "-i",
+        img_path,
+        "-vf",
+        f"scale={width}:{height}:flags=lanczos",
+        "-f",
+        "rawvideo",
+        "-pix_fmt",
+        "yuv420p",
+        "pipe:1",
+    ]
+    result = subprocess.run(command, capture_output=True)
+    luma_size = width * height
+    chroma_size = luma_size // 4
+    if result.returncode != 0 or len(result.stdout) != luma_size + 2 * chroma_size:
+        print(f"❌ Error decoding {img_path}:\n{result.stderr.decode()}")
+        return None
+    data = np.frombuffer(result.stdout, dtype=np.uint8)
+    return (
+        data[:luma_size].reshape(height, width),
+        data[luma_size : luma_size + chroma_size].reshape(height // 2, width // 2),
+        data[luma_size + chroma_size :].reshape(height // 2, width // 2),
+    )
+
+
+def motion_trajectory(segment_num, frame_count, source_size, output_size):
+    """
+    Precomputes the pan/zoom of a panel for all frames at once.
+    Returns (rows, cols): for every frame, the source row and column sampled by
+    each output row and column, shaped (frame_count, height) and
+    (frame_count, width).
+    """
+    import numpy as np
+
+    source_width, source_height = source_size
+    width, height = output_size
+    zoom_0, zoom_1, x_0, x_1, y_0, y_1 = MOTION_PATTERNS[
+        (segment_num - 1) % len(MOTION_PATTERNS)
+    ]
+
+    t = np.linspace(0.0, 1.0, frame_count)
+    ease = t * t * (3 - 2 * t)  # Smoothstep: no jolt at the start or end
+    crop = 1 / (zoom_0 + (zoom_1 - zoom_0) * ease)  # Crop size as a fraction
+    left = (1 - crop) * (x_0 + (x_1 - x_0) * ease)
+    top = (1 - crop) * (y_0 + (y_1 - y_0) * ease)
+
+    # Sample at pixel centres of the crop window
+    col_steps = (np.arange(width) + 0.5) / width
+    row_steps = (np.arange(height) + 0.5) / height
+    cols = (left[:, None] + crop[:, None] * col_steps) * source_width
+    rows = (top[:, None] + crop[:, None] * row_steps) * source_height
+    cols = np.clip(cols.astype(np.intp), 0, source_width - 1)
+    rows = np.clip(rows.astype(np.intp), 0, source_height - 1)
+    return rows, cols
+
+
+def encode_motion_segment(command, img_path, duration, segment_num, size):
+    """
+    Runs the encoder `command`, feeding it Ken Burns frames of the panel on
+    stdin. Returns a CompletedProcess like subprocess.run.
+    """
+    import numpy as np
+
+    width, height = size
+    frame_count = math.ceil(duration * FRAME_RATE)
+    planes = load_panel_planes(
+        img_path, width * MOTION_SUPERSAMPLE, height * MOTION_SUPERSAMPLE
+    )
+    if planes is None:
+        return subprocess.CompletedProcess(command, 1, b"", b"Could not decode panel")
+    # The chroma planes follow the same pan/zoom at half resolution
+    trajectories = [
+        motion_trajectory(
+            segment_num,
+            frame_count,
+            (plane.shape[1], plane.shape[0]),
+            (width // scale, height // scale),
+        )
+        for plane, scale in zip(planes, (1, 2, 2))
+    ]
+
+    # stderr goes to a file: a full stderr pipe would deadlock the stdin writes
+    with tempfile.TemporaryFile() as stderr_file:
+        process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=stderr_file,
+        )
+        try:
+            for i in range(frame_count):
+                for plane, (rows, cols) in zip(planes, trajectories):
+                    cropped = np.take(np.take(plane, rows[i], axis=0), cols[i], axis=1)
+                    process.stdin.write(cropped.data)
+            process.stdin.close()
+        except BrokenPipeError:
+            pass  # The encoder exited early; its stderr explains why
+        returncode = process.wait()
+        stderr_file.seek(0)
+        stderr = stderr_file.read()
+    return subprocess.CompletedProcess(command, returncode, b"", stderr)
+
+
+def segment_settings():
+    """Returns every setting that affects how segments are encoded."""
+    return {
+        "resolution": RESOLUTION,
+        "renditions": RENDITIONS if MULTI_RENDITION else None,
+        "video_codec_args": video_codec_args(),
+        "motion": MOTION_PATTERNS if MOTION_MODE else None,
+        "motion_supersample": MOTION_SUPERSAMPLE if MOTION_MODE else None,
+        "hls_keyframes": HLS_SEGMENT_SECONDS if STREAMING_OUTPUT else None,
+        "transition_frames": transition_frames(),
+    }
+
+
+def segment_cache_valid():
+    """True if the segments on disk were encoded with the current settings."""
+    if not KEEP_SEGMENTS or not os.path.exists(SEGMENT_SETTINGS_FILE):
+        return False
+    with open(SEGMENT_SETTINGS_FILE) as f:
+        try:
+            return json.load(f) == segment_settings()
+        except json.JSONDecodeError:
+            return False
+
+
+def segment_is_current(img_path, audio_path, output_paths):
+    """True if every output segment exists and is newer than both of its inputs."""
+    if not all(os.path.exists(path) for path in output_paths):
+        return False
+    newest_input = max(os.path.getmtime(img_path), os.path.getmtime(audio_path))
+    return min(os.path.getmtime(path) for path in output_paths) > newest_input
+
+
+def create_video_segments(
+    image_files, audio_files, on_segment_ready=None, renditions=None
+):
+    """
+    Creates individual video clips for each frame-audio pair.
+    If `on_segment_ready` is given, it is called with (segment_path, segment_num)
+    as soon as each segment is encoded, in order.
+    If `renditions` (name -> resolution) is given, every rendition is encoded
+    from the same decode pass and a dict of name -> segment paths is returned;
+    `on_segment_ready` then receives the first rendition's segment.
+    With KEEP_SEGMENTS, segments that are newer than their inputs are reused.
+    """
     print(f"\n--- Step 1: Creating {len(image_files)} individual video segments ---")
-    os.makedirs(TEMP_VIDEO_DIR, exist_ok=True)
+    if renditions:
+        rendition_dirs = {
+            name: os.path.join(TEMP_VIDEO_DIR, name) for name in renditions
+        }
+    else:
+        rendition_dirs = {None: TEMP_VIDEO_DIR}
+    for segment_dir in rendition_dirs.values():
+        os.makedirs(segment_dir, exist_ok=True)
 
-    segment_paths = []
+    reuse_segments = segment_cache_valid()
+    if KEEP_SEGMENTS:
+        with open(SEGMENT_SETTINGS_FILE, "w") as f:
+            json.dump(segment_settings(), f)
+
+    segment_paths = {name: [] for name in rendition_dirs}
     for i, (img_path, audio_path) in enumerate(zip(image_files, audio_files)):
         segment_num = i + 1
-        output_path = os.path.join(TEMP_VIDEO_DIR, f"segment_{segment_num:02d}.mp4")
+        output_paths = {
+            name: os.path.join(segment_dir, f"segment_{segment_num:02d}.mp4")
+            for name, segment_dir in rendition_dirs.items()
+        }
+
+        if reuse_segments and segment_is_current(
+            img_path, audio_path, output_paths.values()
+        ):
+            print(f"Reusing segment {segment_num}/{len(image_files)} (up to date).")
+            for name, output_path in output_paths.items():
+                segment_paths[name].append(output_path)
+                governor.add_file("movie", output_path)
+            if on_segment_ready:
+                on_segment_ready(next(iter(output_paths.values())), segment_num)
+            continue
 
         duration = get_audio_duration(audio_path)
         # Add a small buffer to prevent audio from being cut off early
@@ -84,52 +473,73 @@ def create_video_segments(image_files, audio_files):
             print(f"Skipping segment {segment_num} due to missing audio duration.")
             continue
 
-        duration += 0.1  # Add 100ms buffer
+        duration += SEGMENT_AUDIO_BUFFER
 
         print(
             f"Creating segment {segment_num}/{len(image_files)} for {os.path.basename(img_path)} (Duration: {duration:.2f}s)..."
         )
 
-        command = [
-            "ffmpeg",
-            "-loop",
-            "1",  # Loop the input image
-            "-i",
-            img_path,  # Input image
-            "-i",
-            audio_path,  # Input audio
-            "-c:v",
-            "libx264",  # Video codec
-            "-tune",
-            "stillimage",  # Optimize for static images
-            "-c:a",
-            "aac",  # Audio codec
-            "-b:a",
-            "192k",  # Audio bitrate
-            "-pix_fmt",
-            "yuv420p",  # Pixel format for broad compatibility
-            "-s",
-            RESOLUTION,  # Set video size
-            "-r",
-            str(FRAME_RATE),  # Set frame rate
-            "-shortest",  # Finish encoding when the shortest stream ends (the audio)
-            "-t",
-            str(duration),  # Explicitly set duration as a fallback
-            "-y",  # Overwrite output file
-            output_path,
+        outputs = [
+            (renditions[name] if renditions else RESOLUTION, output_paths[name])
+            for name in rendition_dirs
         ]
+        # Renditions share one AAC encode of the audio, copied into each output
+        shared_audio = len(outputs) > 1
+        audio_input = audio_path
+        if shared_audio:
+            audio_input = os.path.join(TEMP_VIDEO_DIR, f"audio_{segment_num:02d}.m4a")
+        command = build_segment_command(
+            img_path, audio_input, duration, outputs, shared_audio
+        )
 
-        result = subprocess.run(command, capture_output=True)
+        memory_bytes = 0
+        if MOTION_MODE:
+            # Upscaled source panel plus the intermediate and final frame buffers
+            width, height = motion_size(outputs)
+            memory_bytes = width * height * 3 // 2 * (MOTION_SUPERSAMPLE**2 + 3)
+        # Waits here while the disk/memory budget is exhausted (backpressure)
+        with governor.reserve(
+            "movie",
+            disk_bytes=int(SEGMENT_DISK_BYTES_PER_SECOND * duration * len(outputs)),
+            memory_bytes=memory_bytes,
+        ):
+            if shared_audio:
+                result = encode_segment_audio(audio_path, audio_input)
+            if not shared_audio or result.returncode == 0:
+                if MOTION_MODE:
+                    result = encode_motion_segment(
+                        command, img_path, duration, segment_num, motion_size(outputs)
+                    )
+                else:
+                    result = subprocess.run(command, capture_output=True)
+            if shared_audio and os.path.exists(audio_input):
+                os.remove(audio_input)
         if result.returncode != 0:
             print(f"❌ Error creating segment {segment_num}:\n{result.stderr.decode()}")
+            # A partial output is newer than its inputs and would pass as current
+            for output_path in output_paths.values():
+                if os.path.exists(output_path):
+                    os.remove(output_path)
         else:
-            segment_paths.append(output_path)
+            for name, output_path in output_paths.items():
+                segment_paths[name].append(output_path)
+                governor.add_file("movie", output_path)
+            if on_segment_ready:
+                on_segment_ready(next(iter(output_paths.values())), segment_num)
 
     print("✅ All video segments created.")
-    return segment_paths
+    if renditions:
+        return segment_paths
+    return segment_paths[None]
 
 
-def create_final_video_simple(segment_paths):
+def rendition_output_filename(name):
+    """Returns the final video filename for a named rendition."""
+    base, ext = os.path.splitext(OUTPUT_FILENAME)
+    return f"{base}_{name}{ext}"
+
+
+def create_final_video_simple(segment_paths, output_filename=OUTPUT_FILENAME):
     """
     Combines all video segments using the reliable `concat` filter (hard cuts).
     This function replaces the complex transition logic.
@@ -141,7 +551,9 @@ def create_final_video_simple(segment_paths):
 
     # Create a text file listing all the segment files for ffmpeg's concat demuxer.
     # This is the most robust method for concatenation.
-    list_file_path = os.path.join(TEMP_VIDEO_DIR, "concat_list.txt")
+    list_file_path = os.path.join(
+        TEMP_VIDEO_DIR, f"concat_list_{os.path.basename(output_filename)}.txt"
+    )
     with open(list_file_path, "w") as f:
         for path in segment_paths:
             # Ffmpeg requires forward slashes and escaped special characters
@@ -159,7 +571,7 @@ def create_final_video_simple(segment_paths):
         "-c",
         "copy",  # Copy streams without re-encoding, it's fast and preserves quality
         "-y",
-        OUTPUT_FILENAME,
+        output_filename,
     ]
 
     print("Executing final render command...")
@@ -167,17 +579,326 @@ def create_final_video_simple(segment_paths):
 
     result = subprocess.run(command, capture_output=True)
     if result.returncode == 0:
-        print(f"✅ Final video successfully created: {OUTPUT_FILENAME}")
+        print(f"✅ Final video successfully created: {output_filename}")
+        governor.add_file("movie", output_filename)
     else:
         print("❌ Error during final video rendering:")
         print(result.stderr.decode())
 
 
+def get_video_frame_count(video_path):
+    """Counts the video frames of a segment using ffprobe (demux only, no decode)."""
+    command = [
+        "ffprobe",
+        "-v",
+        "quiet",
+        "-select_streams",
+        "v:0",
+        "-count_packets",
+        "-show_entries",
+        "stream=nb_read_packets",
+        "-print_format",
+        "json",
+        video_path,
+    ]
+    try:
+        result = subprocess.run(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            check=True,
+        )
+        info = json.loads(result.stdout)
+        return int(info["streams"][0]["nb_read_packets"])
+    except (
+        subprocess.CalledProcessError,
+        json.JSONDecodeError,
+        KeyError,
+        IndexError,
+    ) as e:
+        print(f"Error counting frames for {video_path}: {e}")
+        return None
+
+
+def boundary_fade_frames(frame_counts, fade_frames):
+    """
+    Returns the crossfade length in frames at each cut. A fade is shortened
+    where a neighbouring segment is too short to give fade_frames to both of
+    its cuts and keep a frame of its own; 0 means a hard cut at that boundary.
+    """
+    return [
+        max(0, min(fade_frames, (before - 1) // 2, (after - 1) // 2))
+        for before, after in zip(frame_counts, frame_counts[1:])
+    ]
+
+
+def create_final_video_crossfade(segment_paths, output_filename=OUTPUT_FILENAME):
+    """
+    Combines all video segments with crossfade transitions, smart-render style.
+    Only TRANSITION_DURATION of video around each cut is re-encoded (xfade);
+    the bulk of every segment is stream-copied from keyframes forced at the end
+    of its fade-in window. Cuts next to a segment too short for the full fade
+    get a shorter one (see boundary_fade_frames). The audio track is rebuilt
+    with acrossfade over the same windows, which is cheap compared to
+    re-encoding video.
+    """
+    print("\n--- Step 2: Combining segments with crossfade transitions ---")
+    fade_frames = transition_frames()
+    frame_counts = [get_video_frame_count(path) for path in segment_paths]
+    if len(segment_paths) < 2 or None in frame_counts:
+        print("Segments are too few or unreadable for crossfades. Using hard cuts.")
+        return create_final_video_simple(segment_paths, output_filename)
+    fades = boundary_fade_frames(frame_counts, fade_frames)
+    if not any(fades):
+        print("Segments are too short for crossfades. Using hard cuts.")
+        return create_final_video_simple(segment_paths, output_filename)
+    for i, fade in enumerate(fades):
+        if fade < fade_frames:
+            print(
+                f"Segments {i + 1}-{i + 2} are short: fading over {fade} frames instead of {fade_frames}."
+            )
+
+    output_name = os.path.splitext(os.path.basename(output_filename))[0]
+    work_dir = os.path.join(TEMP_VIDEO_DIR, f"crossfade_{output_name}")
+    os.makedirs(work_dir, exist_ok=True)
+
+    pieces = []
+    last = len(segment_paths) - 1
+    for i, (path, frame_count) in enumerate(zip(segment_paths, frame_counts)):
+        # Body: everything outside the fade windows, copied without re-encoding
+        start_frame = fades[i - 1] if i > 0 else 0
+        end_frame = frame_count - fades[i] if i < last else frame_count
+        body_path = os.path.join(work_dir, f"body_{i + 1:02d}.mp4")
+        command = [
+            "ffmpeg",
+            "-ss",
+            f"{start_frame / FRAME_RATE:.6f}",
+            "-i",
+            path,
+            "-map",
+            "0:v",
+        ]
+        if start_frame in (0, fade_frames):
+            command += ["-c", "copy"]  # Starts on a keyframe from keyframe_times
+        else:
+            # A shortened fade-in ends between keyframes; such bodies are short
+            command += video_codec_args()
+        command += [
+            "-frames:v",
+            str(end_frame - start_frame),
+            "-y",
+            body_path,
+        ]
+        result = subprocess.run(command, capture_output=True)
+        if result.returncode != 0:
+            print(f"❌ Error copying body of segment {i + 1}:\n{result.stderr.decode()}")
+            return
+        pieces.append(body_path)
+        governor.add_file("movie", body_path)
+        body_frames = get_video_frame_count(body_path)
+        if body_frames != end_frame - start_frame:
+            # A drifting body would desync every later cut from its audio fade
+            print(
+                f"Body of segment {i + 1} has {body_frames} frames instead of {end_frame - start_frame}. Using hard cuts."
+            )
+            for piece in pieces:
+                governor.remove_file(piece)
+            return create_final_video_simple(segment_paths, output_filename)
+
+        if i == last or not fades[i]:
+            continue
+
+        # Transition: the only frames that are decoded and re-encoded
+        fade_seconds = fades[i] / FRAME_RATE
+        transition_path = os.path.join(work_dir, f"transition_{i + 1:02d}.mp4")
+        command = [
+            "ffmpeg",
+            "-ss",
+            f"{end_frame / FRAME_RATE:.6f}",
+            "-i",
+            path,
+            "-i",
+            segment_paths[i + 1],
+            "-filter_complex",
+            f"[0:v]trim=end_frame={fades[i]},setpts=PTS-STARTPTS[a];"
+            f"[1:v]trim=end_frame={fades[i]},setpts=PTS-STARTPTS[b];"
+            f"[a][b]xfade=transition=fade:duration={fade_seconds:.6f}:offset=0[v]",
+            "-map",
+            "[v]",
+        ] + video_codec_args() + [
+            "-frames:v",
+            str(fades[i]),
+            "-y",
+            transition_path,
+        ]
+        result = subprocess.run(command, capture_output=True)
+        if result.returncode != 0:
+            print(f"❌ Error rendering transition {i + 1}:\n{result.stderr.decode()}")
+            return
+        pieces.append(transition_path)
+        governor.add_file("movie", transition_path)
+
+    list_file_path = os.path.join(work_dir, "concat_list.txt")
+    with open(list_file_path, "w") as f:
+        for path in pieces:
+            safe_path = os.path.abspath(path).replace("\\", "/").replace("'", "'\\''")
+            f.write(f"file '{safe_path}'\n")
+
+    # Pad/trim each segment's audio to its video length, then chain acrossfades
+    # (or plain concatenation at hard cuts) so every audio overlap lines up with
+    # a video transition.
+    filters = []
+    for i, frame_count in enumerate(frame_counts):
+        filters.append(
+            f"[{i + 1}:a]apad,atrim=0:{frame_count / FRAME_RATE:.6f}[a{i}]"
+        )
+    previous = "a0"
+    for i, fade in enumerate(fades, start=1):
+        if fade:
+            join = f"acrossfade=d={fade / FRAME_RATE:.6f}"
+        else:
+            join = "concat=n=2:v=0:a=1"
+        filters.append(f"[{previous}][a{i}]{join}[x{i}]")
+        previous = f"x{i}"
+
+    command = ["ffmpeg", "-f", "concat", "-safe", "0", "-i", list_file_path]
+    for path in segment_paths:
+        command += ["-i", path]
+    command += [
+        "-filter_complex",
+        ";".join(filters),
+        "-map",
+        "0:v",
+        "-map",
+        f"[{previous}]",
+        "-c:v",
+        "copy",
+        "-c:a",
+        "aac",
+        "-b:a",
+        "192k",
+        "-y",
+        output_filename,
+    ]
+
+    transitions = sum(1 for fade in fades if fade)
+    print(
+        f"Executing final render command ({transitions} transitions of up to {fade_frames / FRAME_RATE:.2f}s)..."
+    )
+    result = subprocess.run(command, capture_output=True)
+    if result.returncode == 0:
+        print(f"✅ Final video successfully created: {output_filename}")
+        governor.add_file("movie", output_filename)
+    else:
+        print("❌ Error during final video rendering:")
+        print(result.stderr.decode())
+
+    # The pieces are useless once muxed; free their disk space right away
+    for path in pieces:
+        governor.remove_file(path)
+
+
+def write_hls_playlist(lines):
+    """Atomically replaces the HLS playlist so players never read a partial file."""
+    tmp_path = HLS_PLAYLIST + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, HLS_PLAYLIST)
+
+
+def start_hls_playlist():
+    """Creates an empty EVENT playlist that finished segments are appended to."""
+    print(f"\n--- Streaming output enabled: {HLS_PLAYLIST} ---")
+    if os.path.exists(HLS_DIR):
+        shutil.rmtree(HLS_DIR)
+    os.makedirs(HLS_DIR)
+    write_hls_playlist(
+        [
+            "#EXTM3U",
+            "#EXT-X-VERSION:7",
+            f"#EXT-X-TARGETDURATION:{HLS_SEGMENT_SECONDS}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+            "#EXT-X-PLAYLIST-TYPE:EVENT",
+            "#EXT-X-INDEPENDENT-SEGMENTS",
+        ]
+    )
+
+
+def append_segment_to_hls(segment_path, segment_num):
+    """
+    Remuxes a finished segment into fragmented MP4 chunks (stream copy, no
+    re-encode) and appends them to the playlist behind a discontinuity tag.
+    """
+    prefix = f"segment_{segment_num:02d}"
+    sub_playlist = os.path.join(HLS_DIR, f"{prefix}.m3u8")
+    command = [
+        "ffmpeg",
+        "-i",
+        segment_path,
+        "-c",
+        "copy",
+        "-f",
+        "hls",
+        "-hls_time",
+        str(HLS_SEGMENT_SECONDS),
+        "-hls_playlist_type",
+        "vod",
+        "-hls_segment_type",
+        "fmp4",
+        "-hls_fmp4_init_filename",
+        f"{prefix}_init.mp4",
+        "-hls_segment_filename",
+        os.path.join(HLS_DIR, f"{prefix}_%03d.m4s"),
+        "-y",
+        sub_playlist,
+    ]
+
+    result = subprocess.run(command, capture_output=True)
+    if result.returncode != 0:
+        print(
+            f"❌ Error streaming segment {segment_num}:\n{result.stderr.decode()}"
+        )
+        return
+
+    # Keep only the init map, chunk durations and chunk URIs of the sub-playlist
+    with open(sub_playlist) as f:
+        entries = [
+            line.strip()
+            for line in f
+            if line.startswith(("#EXT-X-MAP", "#EXTINF"))
+            or (line.strip() and not line.startswith("#"))
+        ]
+    os.remove(sub_playlist)
+    for path in glob.glob(os.path.join(HLS_DIR, f"{prefix}_*")):
+        governor.add_file("movie", path)
+
+    with open(HLS_PLAYLIST) as f:
+        lines = f.read().splitlines()
+    if any(line.startswith("#EXTINF") for line in lines):
+        # Every segment starts its own timeline and init section
+        lines.append("#EXT-X-DISCONTINUITY")
+    write_hls_playlist(lines + entries)
+    print(f"📡 Segment {segment_num} published to {HLS_PLAYLIST}")
+
+
+def finalize_hls_playlist():
+    """
+    Marks the playlist complete. The full film can also be derived from it by
+    stream copy: `ffmpeg -i comic_slideshow_hls/index.m3u8 -c copy out.mp4`.
+    """
+    with open(HLS_PLAYLIST) as f:
+        lines = f.read().splitlines()
+    write_hls_playlist(lines + ["#EXT-X-ENDLIST"])
+    print(f"✅ Streaming playlist finalized: {HLS_PLAYLIST}")
+
+
 def cleanup():
     """Removes the temporary directory."""
     print("\n--- Step 3: Cleaning up temporary files ---")
     if os.path.exists(TEMP_VIDEO_DIR):
         shutil.rmtree(TEMP_VIDEO_DIR)
+        governor.forget_directory(TEMP_VIDEO_DIR)
         print(f"Removed temporary directory: {TEMP_VIDEO_DIR}")
 
 
@@ -201,10 +922,41 @@ def main():
         )
         return
 
-    video_segments = create_video_segments(image_files, audio_files)
-    create_final_video_simple(video_segments)
-    cleanup()
+    renditions = RENDITIONS if MULTI_RENDITION else None
+    if STREAMING_OUTPUT:
+        start_hls_playlist()
+        video_segments = create_video_segments(
+            image_files,
+            audio_files,
+            on_segment_ready=append_segment_to_hls,
+            renditions=renditions,
+        )
+        finalize_hls_playlist()
+    else:
+        video_segments = create_video_segments(
+            image_files, audio_files, renditions=renditions
+        )
+
+    if transition_frames():
+        create_final_video = create_final_video_crossfade
+    else:
+        create_final_video = create_final_video_simple
+    if renditions:
+        for name, segment_paths in video_segments.items():
+            create_final_video(segment_paths, rendition_output_filename(name))
+    else:
+        create_final_video(video_segments)
+
+    if KEEP_SEGMENTS:
+        # Kept segments are only a cache from here on and may be evicted
+        all_segments = video_segments.values() if renditions else [video_segments]
+        for segment_paths in all_segments:
+            for path in segment_paths:
+                governor.mark_reclaimable(path)
+    else:
+        cleanup()
 
 
 if __name__ == "__main__":
     main()
+    governor.report()
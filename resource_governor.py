@@ -0,0 +1,222 @@
+import os
+import sys
+import threading
+import contextlib
+
+# --- Configuration ---
+MAX_DISK_BYTES = 4 * 1024**3  # Intermediates and outputs tracked by the pipeline
+MAX_MEMORY_BYTES = 2 * 1024**3  # Large in-memory buffers (decoded panels, PCM)
+
+
+def format_bytes(num_bytes):
+    """Formats a byte count as e.g. '12.3 MB'."""
+    for unit in ["B", "KB", "MB", "GB"]:
+        if abs(num_bytes) < 1024 or unit == "GB":
+            precision = 0 if unit == "B" else 1
+            return f"{num_bytes:.{precision}f} {unit}"
+        num_bytes /= 1024
+
+
+def measured_peak_rss():
+    """
+    Returns the measured peak resident memory as (this process, largest child
+    process such as ffmpeg) in bytes, or None where `resource` is unavailable.
+    """
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    unit = 1 if sys.platform == "darwin" else 1024
+    return (
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit,
+    )
+
+
+class ResourceGovernor:
+    """
+    Tracks bytes on disk and in memory per pipeline stage ("frames", "audio",
+    "movie", ...), shared by the generation and encode threads.
+
+    Work reserves its expected usage with `reserve()` before starting; when a
+    limit would be exceeded, reclaimable intermediates are evicted first and
+    otherwise the caller blocks until running work releases its share. This
+    pauses new predictions instead of letting usage grow unbounded.
+
+    Backpressure only works between concurrent threads of one process: a
+    reservation waits for other reservations to end, so work that runs alone
+    (such as the sequential movie encodes) is never paused. When a reservation
+    does not fit even with nothing else running, it proceeds with a warning.
+    Separate processes do not see each other's usage.
+    """
+
+    def __init__(
+        self, max_disk_bytes=MAX_DISK_BYTES, max_memory_bytes=MAX_MEMORY_BYTES
+    ):
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self.condition = threading.Condition()
+        self.files = {}  # path -> [stage, size, reclaimable], in registration order
+        self.reserved_disk = {}  # stage -> bytes
+        self.reserved_memory = {}  # stage -> bytes
+        self.active_reservations = 0
+        self.peak_disk = {}
+        self.peak_memory = {}
+        self.evicted_bytes = 0
+
+    def stage_disk(self, stage):
+        """Bytes on disk attributed to a stage, including pending reservations."""
+        files = sum(size for s, size, _ in self.files.values() if s == stage)
+        return files + self.reserved_disk.get(stage, 0)
+
+    def total_disk(self):
+        """Bytes on disk across all stages, including pending reservations."""
+        return sum(size for _, size, _ in self.files.values()) + sum(
+            self.reserved_disk.values()
+        )
+
+    def update_peaks(self, stage):
+        """Records the current usage of a stage if it is a new peak."""
+        self.peak_disk[stage] = max(
+            self.peak_disk.get(stage, 0), self.stage_disk(stage)
+        )
+        self.peak_memory[stage] = max(
+            self.peak_memory.get(stage, 0), self.reserved_memory.get(stage, 0)
+        )
+
+    def evict(self, bytes_needed):
+        """
+        Deletes reclaimable files, oldest first, until `bytes_needed` bytes are
+        freed or none are left. Must be called with the condition held.
+        """
+        freed = 0
+        for path, (stage, size, reclaimable) in list(self.files.items()):
+            if freed >= bytes_needed:
+                break
+            if not reclaimable:
+                continue
+            if os.path.exists(path):
+                os.remove(path)
+            del self.files[path]
+            freed += size
+            print(f"♻️  Evicted {path} ({format_bytes(size)}) from stage '{stage}'.")
+        self.evicted_bytes += freed
+        return freed
+
+    def fits(self, disk_bytes, memory_bytes):
+        """True if a reservation fits within the disk and memory limits."""
+        return (
+            self.total_disk() + disk_bytes <= self.max_disk_bytes
+            and sum(self.reserved_memory.values()) + memory_bytes
+            <= self.max_memory_bytes
+        )
+
+    @contextlib.contextmanager
+    def reserve(self, stage, disk_bytes=0, memory_bytes=0):
+        """
+        Blocks until `disk_bytes` and `memory_bytes` fit within the limits, then
+        holds them for the duration of the `with` block. The block receives the
+        reservation; passing it to `add_file` moves the bytes of each file
+        written from the reservation to the file, so they are not counted twice.
+        """
+
+        def evict_and_check():
+            overflow = self.total_disk() + disk_bytes - self.max_disk_bytes
+            if overflow > 0:
+                self.evict(overflow)
+            # With nothing else running, no release could ever make room
+            return (
+                self.fits(disk_bytes, memory_bytes) or self.active_reservations == 0
+            )
+
+        with self.condition:
+            if not evict_and_check():
+                print(f"⏸️  Stage '{stage}' waiting for disk/memory budget...")
+                self.condition.wait_for(evict_and_check)
+            if not self.fits(disk_bytes, memory_bytes):
+                print(
+                    f"⚠️  Stage '{stage}' needs disk {format_bytes(disk_bytes)}, memory {format_bytes(memory_bytes)}, which exceeds the budget; running it anyway."
+                )
+            self.reserved_disk[stage] = self.reserved_disk.get(stage, 0) + disk_bytes
+            self.reserved_memory[stage] = (
+                self.reserved_memory.get(stage, 0) + memory_bytes
+            )
+            self.active_reservations += 1
+            self.update_peaks(stage)
+        reservation = {"stage": stage, "disk_bytes": disk_bytes}
+        try:
+            yield reservation
+        finally:
+            with self.condition:
+                self.reserved_disk[stage] -= reservation["disk_bytes"]
+                self.reserved_memory[stage] -= memory_bytes
+                self.active_reservations -= 1
+                self.condition.notify_all()
+
+    def add_file(self, stage, path, reclaimable=False, reservation=None):
+        """
+        Starts tracking a file written by a stage (or updates its size). If the
+        file was written under `reservation`, its growth is taken out of it.
+        """
+        if not os.path.exists(path):
+            return
+        size = os.path.getsize(path)
+        with self.condition:
+            # Re-adding moves it to the newest position
+            previous = self.files.pop(path, None)
+            self.files[path] = [stage, size, reclaimable]
+            if reservation is not None:
+                growth = size - previous[1] if previous else size
+                credit = min(max(growth, 0), reservation["disk_bytes"])
+                reservation["disk_bytes"] -= credit
+                self.reserved_disk[reservation["stage"]] -= credit
+            self.update_peaks(stage)
+
+    def mark_reclaimable(self, path):
+        """Marks a tracked intermediate as safe to evict once it is no longer in use."""
+        with self.condition:
+            if path in self.files:
+                self.files[path][2] = True
+                self.condition.notify_all()
+
+    def remove_file(self, path):
+        """Deletes a tracked intermediate early and stops tracking it."""
+        with self.condition:
+            self.files.pop(path, None)
+            if os.path.exists(path):
+                os.remove(path)
+            self.condition.notify_all()
+
+    def forget_directory(self, directory):
+        """Stops tracking files under a directory that was removed (e.g. rmtree)."""
+        prefix = os.path.join(os.path.abspath(directory), "")
+        with self.condition:
+            for path in list(self.files):
+                if os.path.abspath(path).startswith(prefix):
+                    del self.files[path]
+            self.condition.notify_all()
+
+    def report(self):
+        """
+        Prints the peak disk usage and reserved memory of every stage. Memory
+        reservations are estimates, so the measured peak RSS is printed too.
+        """
+        if not self.peak_disk:
+            return
+        print("\n--- Peak resource usage per stage ---")
+        for stage in self.peak_disk:
+            print(
+                f"   - {stage}: disk {format_bytes(self.peak_disk[stage])}, reserved memory {format_bytes(self.peak_memory[stage])}"
+            )
+        peak_rss = measured_peak_rss()
+        if peak_rss:
+            print(
+                f"   Measured peak RSS: {format_bytes(peak_rss[0])} (this process), {format_bytes(peak_rss[1])} (largest subprocess)"
+            )
+        if self.evicted_bytes:
+            print(f"   Evicted {format_bytes(self.evicted_bytes)} of intermediates early.")
+
+
+# Shared by create_frames, create_audio and create_movie within one process
+governor = ResourceGovernor()